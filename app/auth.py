@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import HTTPException, Request, status
 from passlib.context import CryptContext
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=12, deprecated="auto")
+pwd_context.handler("bcrypt").set_backend("bcrypt")
+
+_executor = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="bcrypt")
+
+LOGIN_CACHE_TTL_SECONDS = 30.0
+LOGIN_CACHE_MAX_ENTRIES = 1024
+_login_cache: dict[tuple[str, str, bytes], tuple[float, bool]] = {}
 
 
 def hash_password(plain_password: str) -> str:
@@ -15,6 +28,44 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def password_backend() -> str:
+    return str(pwd_context.handler("bcrypt").get_backend())
+
+
+async def ahash_password(plain_password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_executor, hash_password, plain_password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor,
+        verify_password,
+        plain_password,
+        hashed_password,
+    )
+
+
+async def averify_login(username: str, plain_password: str, hashed_password: str) -> bool:
+    # Keyed on the stored hash too, so a password change invalidates old entries.
+    key = (username, hashed_password, hashlib.sha256(plain_password.encode("utf-8")).digest())
+    now = time.monotonic()
+    cached = _login_cache.pop(key, None)
+    if cached is not None and cached[0] > now:
+        _login_cache[key] = cached
+        return cached[1]
+
+    verified = await averify_password(plain_password, hashed_password)
+    while len(_login_cache) >= LOGIN_CACHE_MAX_ENTRIES:
+        _login_cache.pop(next(iter(_login_cache)))
+    _login_cache[key] = (now + LOGIN_CACHE_TTL_SECONDS, verified)
+    return verified
+
+
+def forget_login(username: str) -> None:
+    for key in [key for key in _login_cache if key[0] == username]:
+        del _login_cache[key]
+
+
 def get_session_user(request: Request) -> str | None:
     value = request.session.get("user")
     if isinstance(value, str) and value:
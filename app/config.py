@@ -42,6 +42,7 @@ class Settings:
     default_browser_concurrency: int
     default_max_retries: int
     default_request_delay_ms: int
+    max_total_http_concurrency: int
 
     def ensure_directories(self) -> None:
         self.database_path.parent.mkdir(parents=True, exist_ok=True)
@@ -72,4 +73,5 @@ def get_settings() -> Settings:
         default_browser_concurrency=_env_int("DEFAULT_BROWSER_CONCURRENCY", 1, 0),
         default_max_retries=_env_int("DEFAULT_MAX_RETRIES", 2, 0),
         default_request_delay_ms=_env_int("DEFAULT_REQUEST_DELAY_MS", 100, 0),
+        max_total_http_concurrency=_env_int("MAX_TOTAL_HTTP_CONCURRENCY", 200, 1),
     )
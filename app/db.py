@@ -1,52 +1,126 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator
 
 import aiosqlite
 
 
+READER_POOL_SIZE = 4
+
+CONNECTION_PRAGMAS = """
+PRAGMA foreign_keys = ON;
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+PRAGMA temp_store = MEMORY;
+PRAGMA mmap_size = 268435456;
+PRAGMA cache_size = -65536;
+PRAGMA wal_autocheckpoint = 1000;
+PRAGMA busy_timeout = 5000;
+"""
+
+
 class Database:
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, reader_pool_size: int = READER_POOL_SIZE) -> None:
         self.path = str(path)
+        self.reader_pool_size = max(1, reader_pool_size)
         self.conn: aiosqlite.Connection | None = None
+        self._readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._transaction_lock = asyncio.Lock()
+
+    async def _open_connection(self) -> aiosqlite.Connection:
+        # Autocommit mode: statements outside transaction() commit on their own.
+        conn = await aiosqlite.connect(self.path, isolation_level=None)
+        conn.row_factory = aiosqlite.Row
+        await conn.executescript(CONNECTION_PRAGMAS)
+        return conn
 
     async def connect(self) -> None:
-        self.conn = await aiosqlite.connect(self.path)
-        self.conn.row_factory = aiosqlite.Row
-        await self.conn.execute("PRAGMA foreign_keys = ON;")
-        await self.conn.execute("PRAGMA journal_mode = WAL;")
-        await self.conn.commit()
+        # The writer goes first so WAL mode is set before any reader opens the file.
+        self.conn = await self._open_connection()
+        readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        for _ in range(self.reader_pool_size):
+            reader = await self._open_connection()
+            await reader.execute("PRAGMA query_only = ON")
+            readers.put_nowait(reader)
+        self._readers = readers
 
     async def close(self) -> None:
+        if self._readers is not None:
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
         if self.conn is not None:
+            await self.conn.executescript("PRAGMA optimize;")
             await self.conn.close()
             self.conn = None
 
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._readers is None:
+            raise RuntimeError("Database is not connected")
+        readers = self._readers
+        conn = await readers.get()
+        try:
+            yield conn
+        finally:
+            readers.put_nowait(conn)
+
     async def execute(self, query: str, params: tuple[Any, ...] = ()) -> None:
         if self.conn is None:
             raise RuntimeError("Database is not connected")
-        await self.conn.execute(query, params)
-        await self.conn.commit()
+        async with self._transaction_lock:
+            await self.conn.execute(query, params)
 
     async def executemany(self, query: str, params: list[tuple[Any, ...]]) -> None:
         if self.conn is None:
             raise RuntimeError("Database is not connected")
-        await self.conn.executemany(query, params)
+        async with self._transaction_lock:
+            await self.conn.executemany(query, params)
+
+    async def executescript(self, script: str) -> None:
+        if self.conn is None:
+            raise RuntimeError("Database is not connected")
+        async with self._transaction_lock:
+            await self.conn.executescript(script)
+
+    async def commit(self) -> None:
+        if self.conn is None:
+            raise RuntimeError("Database is not connected")
         await self.conn.commit()
 
-    async def fetchone(self, query: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
         if self.conn is None:
             raise RuntimeError("Database is not connected")
-        cursor = await self.conn.execute(query, params)
-        row = await cursor.fetchone()
+        async with self._transaction_lock:
+            await self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                await self.conn.commit()
+            except BaseException:
+                await self.conn.rollback()
+                raise
+
+    async def fetchone(self, query: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
+        async with self._reader() as conn, conn.execute(query, params) as cursor:
+            row = await cursor.fetchone()
         if row is None:
             return None
         return dict(row)
 
+    async def fetchone_row(self, query: str, params: tuple[Any, ...] = ()) -> sqlite3.Row | None:
+        async with self._reader() as conn, conn.execute(query, params) as cursor:
+            return await cursor.fetchone()
+
     async def fetchall(self, query: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
-        if self.conn is None:
-            raise RuntimeError("Database is not connected")
-        cursor = await self.conn.execute(query, params)
-        rows = await cursor.fetchall()
+        async with self._reader() as conn, conn.execute(query, params) as cursor:
+            rows = await cursor.fetchall()
         return [dict(row) for row in rows]
+
+    async def fetchall_rows(self, query: str, params: tuple[Any, ...] = ()) -> list[sqlite3.Row]:
+        async with self._reader() as conn, conn.execute(query, params) as cursor:
+            return list(await cursor.fetchall())
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
 import json
+import logging
 from contextlib import asynccontextmanager
 from typing import Any
 
 from fastapi import FastAPI, Form, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.types import Receive, Scope, Send
 
-from app.auth import get_session_user, hash_password, verify_password
+from app.auth import ahash_password, averify_login, forget_login, get_session_user, password_backend
 from app.config import get_settings
 from app.db import Database
 from app.profiles import ProfileStore
@@ -19,8 +22,24 @@ from app.services.worker import JobManager
 from app import repository
 
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 templates = Jinja2Templates(directory=str(settings.templates_dir))
+templates.env.auto_reload = False
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+LOGIN_TEMPLATE = templates.get_template("login.html")
+INDEX_TEMPLATE = templates.get_template("index.html")
+
+SESSIONLESS_PATHS = frozenset({"/healthz"})
+HEALTHZ_BODY = b'{"status":"ok"}'
+
+
+class AppSessionMiddleware(SessionMiddleware):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope.get("path") in SESSIONLESS_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
 
 
 @asynccontextmanager
@@ -29,17 +48,26 @@ async def lifespan(app: FastAPI) -> Any:
 
     if len(settings.admin_password.encode("utf-8")) > 72:
         raise RuntimeError("ADMIN_PASSWORD must be 72 bytes or fewer for bcrypt")
+    logger.info("Password hashing backend: bcrypt (%s)", password_backend())
 
     db = Database(settings.database_path)
     await db.connect()
     await repository.initialize_schema(db)
     await repository.reset_stuck_jobs(db)
-    await repository.ensure_user(db, settings.admin_username, hash_password(settings.admin_password))
+    await repository.ensure_user(db, settings.admin_username, await ahash_password(settings.admin_password))
 
     profile_store = ProfileStore(settings.profiles_dir, settings.base_dir)
     profile_store.load()
 
     app.state.settings = settings
+    app.state.defaults_json = json.dumps(
+        {
+            "default_http_concurrency": settings.default_http_concurrency,
+            "default_browser_concurrency": settings.default_browser_concurrency,
+            "default_max_retries": settings.default_max_retries,
+            "default_request_delay_ms": settings.default_request_delay_ms,
+        }
+    )
     app.state.db = db
     app.state.profile_store = profile_store
 
@@ -55,14 +83,14 @@ async def lifespan(app: FastAPI) -> Any:
 
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
-app.add_middleware(SessionMiddleware, secret_key=settings.secret_key, same_site="lax")
+app.add_middleware(AppSessionMiddleware, secret_key=settings.secret_key, same_site="lax")
 app.mount("/static", StaticFiles(directory=str(settings.static_dir)), name="static")
 app.include_router(api_router)
 
 
 @app.get("/healthz")
-async def healthz() -> dict[str, str]:
-    return {"status": "ok"}
+async def healthz() -> Response:
+    return Response(content=HEALTHZ_BODY, media_type="application/json")
 
 
 @app.get("/login")
@@ -70,9 +98,9 @@ async def login_page(request: Request) -> Any:
     if get_session_user(request):
         return RedirectResponse(url="/", status_code=303)
     return templates.TemplateResponse(
-        "login.html",
+        request,
+        LOGIN_TEMPLATE,
         {
-            "request": request,
             "error": "",
             "app_name": settings.app_name,
         },
@@ -86,35 +114,38 @@ async def login_submit(
     password: str = Form(...),
 ) -> Any:
     db = request.app.state.db
-    user = await repository.get_user_by_username(db, username.strip())
-    if not user or not user.get("is_active"):
+    user = await repository.get_user_for_login(db, username.strip())
+    if user is None:
         return templates.TemplateResponse(
-            "login.html",
+            request,
+            LOGIN_TEMPLATE,
             {
-                "request": request,
                 "error": "Invalid username or password",
                 "app_name": settings.app_name,
             },
             status_code=400,
         )
 
-    if not verify_password(password, str(user["password_hash"])):
+    if not await averify_login(user.username, password, user.password_hash):
         return templates.TemplateResponse(
-            "login.html",
+            request,
+            LOGIN_TEMPLATE,
             {
-                "request": request,
                 "error": "Invalid username or password",
                 "app_name": settings.app_name,
             },
             status_code=400,
         )
 
-    request.session["user"] = str(user["username"])
+    request.session["user"] = user.username
     return RedirectResponse(url="/", status_code=303)
 
 
 @app.get("/logout")
 async def logout(request: Request) -> Any:
+    user = get_session_user(request)
+    if user is not None:
+        forget_login(user)
     request.session.clear()
     return RedirectResponse(url="/login", status_code=303)
 
@@ -125,19 +156,12 @@ async def index(request: Request) -> Any:
     if user is None:
         return RedirectResponse(url="/login", status_code=303)
 
-    defaults = {
-        "default_http_concurrency": settings.default_http_concurrency,
-        "default_browser_concurrency": settings.default_browser_concurrency,
-        "default_max_retries": settings.default_max_retries,
-        "default_request_delay_ms": settings.default_request_delay_ms,
-    }
-
     return templates.TemplateResponse(
-        "index.html",
+        request,
+        INDEX_TEMPLATE,
         {
-            "request": request,
             "app_name": settings.app_name,
             "user": user,
-            "defaults_json": json.dumps(defaults),
+            "defaults_json": request.app.state.defaults_json,
         },
     )
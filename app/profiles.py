@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
@@ -15,6 +17,19 @@ DEFAULT_BLOCKED_KEYWORDS = [
     "security check",
     "access denied",
 ]
+_DEFAULT_BLOCKED_BY_KEY = {item.lower().strip(): item for item in DEFAULT_BLOCKED_KEYWORDS}
+
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _read_profile_file(profile_file: Path) -> dict[str, Any] | None:
+    try:
+        raw = yaml.load(profile_file.read_text(encoding="utf-8"), Loader=_YAML_LOADER) or {}
+    except Exception:
+        return None
+    if not isinstance(raw, dict):
+        return None
+    return raw
 
 
 class ProfileStore:
@@ -22,20 +37,41 @@ class ProfileStore:
         self.profiles_dir = profiles_dir
         self.base_dir = base_dir
         self._profiles: dict[str, dict[str, Any]] = {}
+        self._file_cache: dict[Path, tuple[tuple[int, int], dict[str, Any] | None]] = {}
 
     def load(self) -> None:
-        self._profiles.clear()
         files = sorted(list(self.profiles_dir.glob("*.yaml")) + list(self.profiles_dir.glob("*.yml")))
+
+        file_cache: dict[Path, tuple[tuple[int, int], dict[str, Any] | None]] = {}
+        stale: list[tuple[Path, tuple[int, int]]] = []
         for profile_file in files:
             try:
-                raw = yaml.safe_load(profile_file.read_text(encoding="utf-8")) or {}
-            except Exception:
+                stat = profile_file.stat()
+            except OSError:
                 continue
-            if not isinstance(raw, dict):
+            signature = (stat.st_mtime_ns, stat.st_size)
+            cached = self._file_cache.get(profile_file)
+            if cached is not None and cached[0] == signature:
+                file_cache[profile_file] = cached
+            else:
+                stale.append((profile_file, signature))
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=min(8, len(stale))) as executor:
+                parsed = list(executor.map(_read_profile_file, [profile_file for profile_file, _ in stale]))
+            for (profile_file, signature), raw in zip(stale, parsed):
+                profile = self._normalize_profile(raw, profile_file) if raw is not None else None
+                file_cache[profile_file] = (signature, profile)
+
+        profiles: dict[str, dict[str, Any]] = {}
+        for profile_file in files:
+            entry = file_cache.get(profile_file)
+            if entry is None or entry[1] is None:
                 continue
+            profiles[entry[1]["name"]] = entry[1]
 
-            profile = self._normalize_profile(raw, profile_file)
-            self._profiles[profile["name"]] = profile
+        self._file_cache = file_cache
+        self._profiles = profiles
 
     def names(self) -> list[str]:
         return sorted(self._profiles.keys())
@@ -47,7 +83,7 @@ class ProfileStore:
         output: list[dict[str, Any]] = []
         for name in self.names():
             profile = self._profiles[name]
-            session_state = self.resolve_storage_state_path(name)
+            session_state = profile["_storage_state_path"]
             output.append(
                 {
                     "name": profile["name"],
@@ -60,12 +96,7 @@ class ProfileStore:
         return output
 
     def resolve_storage_state_path(self, profile_name: str) -> Path:
-        profile = self._profiles[profile_name]
-        raw_path = profile["browser"].get("storage_state_path", f"sessions/{profile_name}.json")
-        path = Path(raw_path)
-        if path.is_absolute():
-            return path
-        return (self.base_dir / path).resolve()
+        return self._profiles[profile_name]["_storage_state_path"]
 
     def _normalize_profile(self, raw: dict[str, Any], profile_file: Path) -> dict[str, Any]:
         name = str(raw.get("name") or profile_file.stem).strip()
@@ -82,10 +113,13 @@ class ProfileStore:
 
         blocked_http = self._normalize_rule(http_cfg.get("blocked"))
         blocked_http["body_contains_any"] = self._dedupe_strings(
-            blocked_http.get("body_contains_any", []) + DEFAULT_BLOCKED_KEYWORDS
+            blocked_http.get("body_contains_any", []),
+            _DEFAULT_BLOCKED_BY_KEY,
+        )
+        blocked_browser = self._dedupe_strings(
+            self._string_list(browser_cfg.get("blocked_text_any")),
+            _DEFAULT_BLOCKED_BY_KEY,
         )
-        blocked_browser = self._string_list(browser_cfg.get("blocked_text_any"))
-        blocked_browser = self._dedupe_strings(blocked_browser + DEFAULT_BLOCKED_KEYWORDS)
 
         profile: dict[str, Any] = {
             "name": name,
@@ -120,6 +154,7 @@ class ProfileStore:
                     0,
                 ),
                 "result_selector": str(browser_cfg.get("result_selector", "")).strip(),
+                "reuse_page": bool(browser_cfg.get("reuse_page", False)),
                 "storage_state_path": str(
                     browser_cfg.get("storage_state_path", f"sessions/{name}.json")
                 ).strip(),
@@ -132,6 +167,28 @@ class ProfileStore:
         if not profile["url_template"] and mode == "url_template":
             profile["url_template"] = "https://example.com/redeem?code={code}"
 
+        for rule_name in ("success", "failure", "blocked"):
+            rule = profile["http"][rule_name]
+            rule["body_pattern"] = self._compile_patterns(rule["body_contains_any"])
+            rule["body_bytes_pattern"] = self._bytes_pattern(rule["body_pattern"])
+            rule["url_pattern"] = self._compile_patterns(rule["url_contains_any"])
+        profile["http"]["ascii_body_patterns"] = all(
+            profile["http"][rule_name]["body_pattern"] is None
+            or profile["http"][rule_name]["body_bytes_pattern"] is not None
+            for rule_name in ("success", "failure", "blocked")
+        )
+        for rule_name in ("success", "failure", "blocked"):
+            profile["browser"][f"{rule_name}_text_pattern"] = self._compile_patterns(
+                self._dedupe_strings(
+                    profile["browser"][f"{rule_name}_text_any"] + profile["http"][rule_name]["body_contains_any"]
+                )
+            )
+
+        storage_state_path = Path(profile["browser"]["storage_state_path"])
+        if not storage_state_path.is_absolute():
+            storage_state_path = (self.base_dir / storage_state_path).resolve()
+        profile["_storage_state_path"] = storage_state_path
+
         return profile
 
     @staticmethod
@@ -177,19 +234,34 @@ class ProfileStore:
                     continue
 
         return {
-            "status_codes": code_values,
+            "status_codes": frozenset(code_values),
             "body_contains_any": ProfileStore._string_list(value.get("body_contains_any")),
             "url_contains_any": ProfileStore._string_list(value.get("url_contains_any")),
         }
 
     @staticmethod
-    def _dedupe_strings(items: list[str]) -> list[str]:
-        seen: set[str] = set()
-        output: list[str] = []
+    def _compile_patterns(items: list[str]) -> re.Pattern[str] | None:
+        # Case-sensitive on lowercased literals: the validator lowercases each text once
+        # and runs every pattern against that copy.
+        literals = [item.strip().lower() for item in items if item.strip()]
+        if not literals:
+            return None
+        return re.compile("|".join(re.escape(item) for item in literals))
+
+    @staticmethod
+    def _bytes_pattern(pattern: re.Pattern[str] | None) -> re.Pattern[bytes] | None:
+        if pattern is None or not pattern.pattern.isascii():
+            return None
+        return re.compile(pattern.pattern.encode("ascii"))
+
+    @staticmethod
+    def _dedupe_strings(items: list[str], defaults: dict[str, str] | None = None) -> list[str]:
+        deduped: dict[str, str] = {}
         for item in items:
             normalized = item.lower().strip()
-            if not normalized or normalized in seen:
-                continue
-            seen.add(normalized)
-            output.append(item)
-        return output
+            if normalized:
+                deduped.setdefault(normalized, item)
+        if defaults:
+            for normalized, item in defaults.items():
+                deduped.setdefault(normalized, item)
+        return list(deduped.values())
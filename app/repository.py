@@ -1,76 +1,187 @@
 from __future__ import annotations
 
+import sqlite3
+import time
 from datetime import datetime, timezone
-from typing import Any
+from enum import IntEnum
+from typing import Any, AsyncIterator, Iterable, NamedTuple
 
 from app.db import Database
 
 
-FINAL_RESULT_STATUSES = {"valid", "invalid", "unknown", "blocked", "error"}
+class ResultStatus(IntEnum):
+    # Stored as INTEGER in results.status; everything at or above `valid` is final.
+    pending = 0
+    running = 1
+    queued_browser = 2
+    valid = 3
+    invalid = 4
+    unknown = 5
+    blocked = 6
+    error = 7
+
+
+class LoginUser(NamedTuple):
+    username: str
+    password_hash: str
+    is_active: int
+
+
+INSERT_CHUNK_SIZE = 10000
+PENDING_PAGE_SIZE = 1000
+EXPORT_PAGE_SIZE = 1000
+
+_STATUS_NAME_SQL = (
+    "CASE status "
+    + " ".join(f"WHEN {status.value} THEN '{status.name}'" for status in ResultStatus)
+    + " END"
+)
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    profile_name TEXT NOT NULL,
+    redeem_url_override TEXT,
+    created_by TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_codes INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    completed_at TEXT,
+    http_concurrency INTEGER NOT NULL,
+    browser_concurrency INTEGER NOT NULL,
+    max_retries INTEGER NOT NULL,
+    request_delay_ms INTEGER NOT NULL,
+    notes TEXT
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    code TEXT NOT NULL,
+    status INTEGER NOT NULL CHECK(status BETWEEN 0 AND 7),
+    source TEXT NOT NULL,
+    reason TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    http_status INTEGER,
+    redirect_url TEXT,
+    checked_at TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE(job_id, code),
+    FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_results_job_id ON results(job_id);
+CREATE INDEX IF NOT EXISTS idx_results_job_status ON results(job_id, status);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+-- 1, 2 = ResultStatus.running, ResultStatus.queued_browser
+CREATE INDEX IF NOT EXISTS idx_results_active_status ON results(status)
+    WHERE status IN (1, 2);
+
+CREATE TABLE IF NOT EXISTS job_counters (
+    job_id TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY(job_id, status)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_results_count_insert AFTER INSERT ON results
+BEGIN
+    INSERT INTO job_counters(job_id, status, count) VALUES (NEW.job_id, NEW.status, 1)
+    ON CONFLICT(job_id, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_results_count_update AFTER UPDATE OF status ON results
+WHEN NEW.status <> OLD.status
+BEGIN
+    UPDATE job_counters SET count = count - 1 WHERE job_id = OLD.job_id AND status = OLD.status;
+    INSERT INTO job_counters(job_id, status, count) VALUES (NEW.job_id, NEW.status, 1)
+    ON CONFLICT(job_id, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_results_count_delete AFTER DELETE ON results
+BEGIN
+    UPDATE job_counters SET count = count - 1 WHERE job_id = OLD.job_id AND status = OLD.status;
+END;
+"""
+
+BACKFILL_JOB_COUNTERS_SQL = """
+INSERT INTO job_counters(job_id, status, count)
+SELECT job_id, status, COUNT(*) FROM results GROUP BY job_id, status;
+"""
+
+# Legacy TEXT-status databases: the insert trigger rebuilds job_counters while copying back.
+LEGACY_RESULTS_PREPARE_SQL = """
+ALTER TABLE results RENAME TO results_legacy;
+DROP INDEX IF EXISTS idx_results_job_id;
+DROP INDEX IF EXISTS idx_results_job_status;
+DROP INDEX IF EXISTS idx_results_active_status;
+DROP TRIGGER IF EXISTS trg_results_count_insert;
+DROP TRIGGER IF EXISTS trg_results_count_update;
+DROP TRIGGER IF EXISTS trg_results_count_delete;
+DROP TABLE IF EXISTS job_counters;
+"""
+
+LEGACY_RESULTS_COPY_SQL = f"""
+INSERT INTO results(
+    id, job_id, code, status, source, reason, attempts,
+    http_status, redirect_url, checked_at, created_at, updated_at
+)
+SELECT
+    id, job_id, code,
+    CASE status {" ".join(f"WHEN '{status.name}' THEN {status.value}" for status in ResultStatus)}
+        ELSE {ResultStatus.unknown.value} END,
+    source, reason, attempts, http_status, redirect_url, checked_at, created_at, updated_at
+FROM results_legacy
+ORDER BY id;
+DROP TABLE results_legacy;
+"""
 
 
 def utc_now() -> str:
     return datetime.now(tz=timezone.utc).isoformat()
 
 
+_utc_second: tuple[int, str] = (0, "")
+
+
+def utc_now_seconds() -> str:
+    global _utc_second
+    now = int(time.time())
+    if now != _utc_second[0]:
+        _utc_second = (now, datetime.fromtimestamp(now, tz=timezone.utc).isoformat())
+    return _utc_second[1]
+
+
 async def initialize_schema(db: Database) -> None:
-    await db.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL,
-            is_active INTEGER NOT NULL DEFAULT 1,
-            created_at TEXT NOT NULL
-        )
-        """
+    status_column = await db.fetchone("SELECT type FROM pragma_table_info('results') WHERE name = 'status'")
+    counters_table = await db.fetchone(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'job_counters'"
     )
 
-    await db.execute(
-        """
-        CREATE TABLE IF NOT EXISTS jobs (
-            id TEXT PRIMARY KEY,
-            profile_name TEXT NOT NULL,
-            redeem_url_override TEXT,
-            created_by TEXT NOT NULL,
-            status TEXT NOT NULL,
-            total_codes INTEGER NOT NULL,
-            created_at TEXT NOT NULL,
-            started_at TEXT,
-            completed_at TEXT,
-            http_concurrency INTEGER NOT NULL,
-            browser_concurrency INTEGER NOT NULL,
-            max_retries INTEGER NOT NULL,
-            request_delay_ms INTEGER NOT NULL,
-            notes TEXT
-        )
-        """
-    )
+    if status_column is not None and str(status_column["type"]).upper() == "TEXT":
+        script = f"{LEGACY_RESULTS_PREPARE_SQL}\n{SCHEMA_SQL}\n{LEGACY_RESULTS_COPY_SQL}"
+    elif counters_table is None:
+        script = f"{SCHEMA_SQL}\n{BACKFILL_JOB_COUNTERS_SQL}"
+    else:
+        script = SCHEMA_SQL
+    await db.executescript(f"BEGIN;\n{script}\nCOMMIT;")
 
-    await db.execute(
-        """
-        CREATE TABLE IF NOT EXISTS results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            job_id TEXT NOT NULL,
-            code TEXT NOT NULL,
-            status TEXT NOT NULL,
-            source TEXT NOT NULL,
-            reason TEXT,
-            attempts INTEGER NOT NULL DEFAULT 0,
-            http_status INTEGER,
-            redirect_url TEXT,
-            checked_at TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL,
-            UNIQUE(job_id, code),
-            FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
-        )
-        """
+    stats_table = await db.fetchone(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
     )
-
-    await db.execute("CREATE INDEX IF NOT EXISTS idx_results_job_id ON results(job_id)")
-    await db.execute("CREATE INDEX IF NOT EXISTS idx_results_job_status ON results(job_id, status)")
-    await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+    if stats_table is None:
+        await db.executescript("ANALYZE results; ANALYZE jobs;")
 
 
 async def ensure_user(db: Database, username: str, password_hash: str) -> None:
@@ -84,11 +195,22 @@ async def ensure_user(db: Database, username: str, password_hash: str) -> None:
     )
 
 
-async def get_user_by_username(db: Database, username: str) -> dict[str, Any] | None:
-    return await db.fetchone(
-        "SELECT id, username, password_hash, is_active, created_at FROM users WHERE username = ?",
+async def get_user_for_login(db: Database, username: str) -> LoginUser | None:
+    row = await db.fetchone_row(
+        "SELECT username, password_hash, is_active FROM users WHERE username = ? AND is_active = 1",
         (username,),
     )
+    if row is None:
+        return None
+    return LoginUser(*row)
+
+
+_INSERT_PENDING_RESULT_SQL = f"""
+INSERT INTO results(
+    job_id, code, status, source, reason, attempts,
+    http_status, redirect_url, checked_at, created_at, updated_at
+) VALUES (?1, ?2, {ResultStatus.pending.value}, 'none', NULL, 0, NULL, NULL, NULL, ?3, ?3)
+"""
 
 
 async def create_job_with_codes(
@@ -107,12 +229,8 @@ async def create_job_with_codes(
     now = utc_now()
     total_codes = len(codes)
 
-    if db.conn is None:
-        raise RuntimeError("Database is not connected")
-
-    await db.conn.execute("BEGIN")
-    try:
-        await db.conn.execute(
+    async with db.transaction() as conn:
+        await conn.execute(
             """
             INSERT INTO jobs(
                 id, profile_name, redeem_url_override, created_by, status,
@@ -135,36 +253,9 @@ async def create_job_with_codes(
             ),
         )
 
-        rows = [
-            (
-                job_id,
-                code,
-                "pending",
-                "none",
-                None,
-                0,
-                None,
-                None,
-                None,
-                now,
-                now,
-            )
-            for code in codes
-        ]
-        await db.conn.executemany(
-            """
-            INSERT INTO results(
-                job_id, code, status, source, reason, attempts,
-                http_status, redirect_url, checked_at, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            rows,
-        )
-
-        await db.conn.commit()
-    except Exception:
-        await db.conn.rollback()
-        raise
+        for start in range(0, total_codes, INSERT_CHUNK_SIZE):
+            chunk = codes[start : start + INSERT_CHUNK_SIZE]
+            await conn.executemany(_INSERT_PENDING_RESULT_SQL, ((job_id, code, now) for code in chunk))
 
 
 async def list_jobs(db: Database, limit: int = 20) -> list[dict[str, Any]]:
@@ -179,31 +270,65 @@ async def list_jobs(db: Database, limit: int = 20) -> list[dict[str, Any]]:
     )
 
 
+_JOBS_BY_STATUS_SELECT = """
+    SELECT id, profile_name, created_by, status, total_codes, created_at, started_at, completed_at,
+           http_concurrency, browser_concurrency, max_retries, request_delay_ms, redeem_url_override
+    FROM jobs
+"""
+_JOBS_BY_ONE_STATUS_SQL = f"{_JOBS_BY_STATUS_SELECT} WHERE status = ? ORDER BY created_at ASC"
+_JOBS_BY_STATUS_SQL = f"{_JOBS_BY_STATUS_SELECT} WHERE status IN (?, ?, ?, ?) ORDER BY created_at ASC"
+_JOBS_BY_STATUS_MAX = 4
+
+
 async def list_jobs_by_status(db: Database, statuses: tuple[str, ...]) -> list[dict[str, Any]]:
-    placeholders = ", ".join(["?"] * len(statuses))
-    return await db.fetchall(
-        f"""
-        SELECT id, profile_name, created_by, status, total_codes, created_at, started_at, completed_at,
-               http_concurrency, browser_concurrency, max_retries, request_delay_ms, redeem_url_override
-        FROM jobs
-        WHERE status IN ({placeholders})
-        ORDER BY created_at ASC
-        """,
-        statuses,
-    )
+    if len(statuses) == 1:
+        return await db.fetchall(_JOBS_BY_ONE_STATUS_SQL, statuses)
+    if len(statuses) > _JOBS_BY_STATUS_MAX:
+        raise ValueError(f"At most {_JOBS_BY_STATUS_MAX} statuses can be filtered at once")
+    # Unused slots are NULL, which never matches.
+    padded = statuses + (None,) * (_JOBS_BY_STATUS_MAX - len(statuses))
+    return await db.fetchall(_JOBS_BY_STATUS_SQL, padded)
+
+
+_JOB_COLUMNS = (
+    "id",
+    "profile_name",
+    "redeem_url_override",
+    "created_by",
+    "status",
+    "total_codes",
+    "created_at",
+    "started_at",
+    "completed_at",
+    "http_concurrency",
+    "browser_concurrency",
+    "max_retries",
+    "request_delay_ms",
+    "notes",
+)
+_JOB_SELECT_SQL = f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?"
 
 
 async def get_job(db: Database, job_id: str) -> dict[str, Any] | None:
-    return await db.fetchone(
-        """
-        SELECT id, profile_name, redeem_url_override, created_by, status, total_codes,
-               created_at, started_at, completed_at, http_concurrency, browser_concurrency,
-               max_retries, request_delay_ms, notes
-        FROM jobs
-        WHERE id = ?
+    return await db.fetchone(_JOB_SELECT_SQL, (job_id,))
+
+
+async def get_job_with_counts(db: Database, job_id: str) -> tuple[dict[str, Any] | None, dict[str, Any]]:
+    rows = await db.fetchall_rows(
+        f"""
+        SELECT {", ".join(f"j.{column}" for column in _JOB_COLUMNS)}, c.status AS counter_status, c.count
+        FROM jobs j
+        LEFT JOIN job_counters c ON c.job_id = j.id AND c.count > 0
+        WHERE j.id = ?
         """,
         (job_id,),
     )
+    if not rows:
+        return None, _summarize_counts(0, [])
+
+    job = {column: rows[0][column] for column in _JOB_COLUMNS}
+    counters = [(row["counter_status"], row["count"]) for row in rows]
+    return job, _summarize_counts(int(job["total_codes"]), counters)
 
 
 async def mark_job_running(db: Database, job_id: str) -> None:
@@ -220,77 +345,101 @@ async def mark_job_completed(db: Database, job_id: str) -> None:
     )
 
 
-async def mark_job_failed(db: Database, job_id: str, note: str) -> None:
+async def mark_job_completed_empty(db: Database, job_id: str) -> None:
+    # Same end state as mark_job_running followed by mark_job_completed.
+    now = utc_now()
     await db.execute(
-        "UPDATE jobs SET status = ?, completed_at = ?, notes = ? WHERE id = ?",
-        ("failed", utc_now(), note[:500], job_id),
+        "UPDATE jobs SET status = ?, started_at = ?, completed_at = ?, notes = NULL WHERE id = ?",
+        ("completed", now, now, job_id),
     )
 
 
-async def reset_stuck_jobs(db: Database) -> None:
-    await db.execute(
-        """
-        UPDATE results
-        SET status = 'pending', source = 'none', reason = NULL, updated_at = ?
-        WHERE status IN ('running', 'queued_browser')
-        """,
-        (utc_now(),),
-    )
+async def mark_job_failed(db: Database, job_id: str, note: str) -> None:
     await db.execute(
-        """
-        UPDATE jobs
-        SET status = 'queued', started_at = NULL, completed_at = NULL,
-            notes = 'Recovered after restart'
-        WHERE status = 'running'
-        """
-    )
-
-
-async def get_pending_results(db: Database, job_id: str) -> list[dict[str, Any]]:
-    return await db.fetchall(
-        "SELECT id, code FROM results WHERE job_id = ? AND status = 'pending' ORDER BY id ASC",
-        (job_id,),
+        "UPDATE jobs SET status = ?, completed_at = ?, notes = ? WHERE id = ?",
+        ("failed", utc_now(), note[:500], job_id),
     )
 
 
-async def mark_result_running(db: Database, result_id: int) -> None:
-    await db.execute(
-        "UPDATE results SET status = ?, source = 'none', updated_at = ? WHERE id = ?",
-        ("running", utc_now(), result_id),
-    )
+async def reset_stuck_jobs(db: Database) -> None:
+    async with db.transaction() as conn:
+        await conn.execute(
+            """
+            UPDATE results
+            SET status = ?, source = 'none', reason = NULL, updated_at = ?
+            WHERE status IN (1, 2)
+            """,
+            (ResultStatus.pending, utc_now()),
+        )
+        await conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'queued', started_at = NULL, completed_at = NULL,
+                notes = 'Recovered after restart'
+            WHERE status = 'running'
+            """
+        )
 
 
-async def mark_result_queued_browser(
+async def iter_pending_results(
     db: Database,
+    job_id: str,
+    *,
+    page_size: int = PENDING_PAGE_SIZE,
+) -> AsyncIterator[list[sqlite3.Row]]:
+    last_id = 0
+    while True:
+        rows = await db.fetchall_rows(
+            "SELECT id, code FROM results WHERE job_id = ? AND status = ? AND id > ? ORDER BY id ASC LIMIT ?",
+            (job_id, ResultStatus.pending, last_id, page_size),
+        )
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_id = int(rows[-1]["id"])
+
+
+_MARK_RESULT_QUEUED_BROWSER_SQL = """
+UPDATE results
+SET status = ?, source = ?, reason = ?, attempts = ?, http_status = ?,
+    redirect_url = ?, updated_at = ?
+WHERE id = ?
+"""
+_MARK_RESULT_FINAL_SQL = """
+UPDATE results
+SET status = ?, source = ?, reason = ?, attempts = ?,
+    http_status = ?, redirect_url = ?, checked_at = ?, updated_at = ?
+WHERE id = ?
+"""
+RESULT_UPDATE_SQL = {
+    "queued_browser": _MARK_RESULT_QUEUED_BROWSER_SQL,
+    "final": _MARK_RESULT_FINAL_SQL,
+}
+
+
+def result_queued_browser_params(
     result_id: int,
     *,
     reason: str,
     attempts: int,
     http_status: int | None,
     redirect_url: str | None,
-) -> None:
-    await db.execute(
-        """
-        UPDATE results
-        SET status = ?, source = ?, reason = ?, attempts = ?, http_status = ?,
-            redirect_url = ?, updated_at = ?
-        WHERE id = ?
-        """,
-        (
-            "queued_browser",
-            "http",
-            reason[:500],
-            attempts,
-            http_status,
-            redirect_url,
-            utc_now(),
-            result_id,
-        ),
+) -> tuple[Any, ...]:
+    return (
+        ResultStatus.queued_browser,
+        "http",
+        reason[:500],
+        attempts,
+        http_status,
+        redirect_url,
+        utc_now_seconds(),
+        result_id,
     )
 
 
-async def mark_result_final(
-    db: Database,
+def result_final_params(
     result_id: int,
     *,
     status: str,
@@ -299,42 +448,44 @@ async def mark_result_final(
     attempts: int,
     http_status: int | None,
     redirect_url: str | None,
-) -> None:
-    now = utc_now()
-    await db.execute(
-        """
-        UPDATE results
-        SET status = ?, source = ?, reason = ?, attempts = ?,
-            http_status = ?, redirect_url = ?, checked_at = ?, updated_at = ?
-        WHERE id = ?
-        """,
-        (
-            status,
-            source,
-            reason[:500],
-            attempts,
-            http_status,
-            redirect_url,
-            now,
-            now,
-            result_id,
-        ),
+) -> tuple[Any, ...]:
+    now = utc_now_seconds()
+    return (
+        ResultStatus[status],
+        source,
+        reason[:500],
+        attempts,
+        http_status,
+        redirect_url,
+        now,
+        now,
+        result_id,
     )
 
 
-async def get_job_counts(db: Database, job_id: str) -> dict[str, Any]:
-    job = await db.fetchone("SELECT total_codes FROM jobs WHERE id = ?", (job_id,))
-    if job is None:
-        return {"total": 0, "processed": 0, "progress_percent": 0.0, "by_status": {}}
-
-    total = int(job["total_codes"])
-    rows = await db.fetchall(
-        "SELECT status, COUNT(*) AS count FROM results WHERE job_id = ? GROUP BY status",
-        (job_id,),
-    )
-
-    counts = {row["status"]: int(row["count"]) for row in rows}
-    processed = sum(count for status, count in counts.items() if status in FINAL_RESULT_STATUSES)
+async def apply_result_updates(db: Database, updates: Iterable[tuple[str, tuple[Any, ...]]]) -> None:
+    # `updates` holds (kind, params) pairs keyed by RESULT_UPDATE_SQL, at most one per result id,
+    # so grouping them by statement doesn't change the outcome.
+    grouped: dict[str, list[tuple[Any, ...]]] = {}
+    for kind, params in updates:
+        grouped.setdefault(kind, []).append(params)
+    if not grouped:
+        return
+    async with db.transaction() as conn:
+        for kind, rows in grouped.items():
+            await conn.executemany(RESULT_UPDATE_SQL[kind], rows)
+
+
+def _summarize_counts(total: int, counters: list[tuple[int | None, int | None]]) -> dict[str, Any]:
+    counts: dict[str, int] = {}
+    processed = 0
+    for code, count in counters:
+        if code is None:
+            continue
+        status = ResultStatus(code)
+        counts[status.name] = int(count or 0)
+        if status >= ResultStatus.valid:
+            processed += counts[status.name]
     progress_percent = 0.0 if total == 0 else round((processed / total) * 100.0, 2)
 
     return {
@@ -357,12 +508,13 @@ async def list_results(
     where_clause = "WHERE job_id = ?"
     if status:
         where_clause += " AND status = ?"
-        params.append(status)
+        params.append(ResultStatus[status])
 
     params.extend([limit, offset])
     return await db.fetchall(
         f"""
-        SELECT id, code, status, source, reason, attempts, http_status, redirect_url, checked_at, updated_at
+        SELECT id, code, {_STATUS_NAME_SQL} AS status, source, reason, attempts, http_status,
+               redirect_url, checked_at, updated_at
         FROM results
         {where_clause}
         ORDER BY id DESC
@@ -372,37 +524,57 @@ async def list_results(
     )
 
 
-async def list_results_for_export(db: Database, job_id: str) -> list[dict[str, Any]]:
-    return await db.fetchall(
-        """
-        SELECT code, status, source, reason, attempts, http_status, redirect_url, checked_at
-        FROM results
-        WHERE job_id = ?
-        ORDER BY id ASC
-        """,
-        (job_id,),
-    )
+async def iter_result_batches_for_export(
+    db: Database,
+    job_id: str,
+    *,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> AsyncIterator[list[tuple[Any, ...]]]:
+    # Rows after the id column are in CSV column order and go to csv.writer as-is.
+    last_id = 0
+    while True:
+        rows = await db.fetchall_rows(
+            f"""
+            SELECT id, code, {_STATUS_NAME_SQL} AS status, source, reason, attempts, http_status,
+                   redirect_url, checked_at
+            FROM results
+            WHERE job_id = ? AND id > ?
+            ORDER BY id ASC
+            LIMIT ?
+            """,
+            (job_id, last_id, page_size),
+        )
+        if not rows:
+            return
+        yield [row[1:] for row in rows]
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
 
 
 async def rerun_uncertain_results(db: Database, job_id: str) -> int:
-    if db.conn is None:
-        raise RuntimeError("Database is not connected")
-
     now = utc_now()
-    cursor = await db.conn.execute(
-        """
-        UPDATE results
-        SET status = 'pending', source = 'none', reason = NULL, attempts = 0,
-            http_status = NULL, redirect_url = NULL, checked_at = NULL, updated_at = ?
-        WHERE job_id = ? AND status IN ('unknown', 'blocked', 'error')
-        """,
-        (now, job_id),
-    )
-    changed = cursor.rowcount if cursor.rowcount is not None else 0
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            """
+            UPDATE results
+            SET status = ?, source = 'none', reason = NULL, attempts = 0,
+                http_status = NULL, redirect_url = NULL, checked_at = NULL, updated_at = ?
+            WHERE job_id = ? AND status IN (?, ?, ?)
+            """,
+            (
+                ResultStatus.pending,
+                now,
+                job_id,
+                ResultStatus.unknown,
+                ResultStatus.blocked,
+                ResultStatus.error,
+            ),
+        )
+        changed = cursor.rowcount if cursor.rowcount is not None else 0
 
-    await db.conn.execute(
-        "UPDATE jobs SET status = 'queued', started_at = NULL, completed_at = NULL, notes = NULL WHERE id = ?",
-        (job_id,),
-    )
-    await db.conn.commit()
+        await conn.execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL, completed_at = NULL, notes = NULL WHERE id = ?",
+            (job_id,),
+        )
     return changed
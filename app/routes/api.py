@@ -1,29 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import csv
 import io
-import json
 import uuid
-from typing import Any
+from pathlib import Path
+from typing import Any, AsyncIterator
 
+import orjson
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
-from fastapi.responses import Response
+from fastapi.responses import StreamingResponse
 
 from app.auth import require_api_user
 from app import repository
 from app.services.code_input import collect_codes
 
 
-ALLOWED_RESULT_STATUSES = {
-    "pending",
-    "running",
-    "queued_browser",
-    "valid",
-    "invalid",
-    "unknown",
-    "blocked",
-    "error",
-}
+ALLOWED_RESULT_STATUSES = frozenset(status.name for status in repository.ResultStatus)
+MAX_SESSION_STATE_BYTES = 5 * 1024 * 1024
+SESSION_READ_CHUNK_BYTES = 64 * 1024
 
 
 router = APIRouter(prefix="/api", tags=["api"])
@@ -33,6 +28,18 @@ def _clamp(value: int, minimum: int, maximum: int) -> int:
     return max(minimum, min(maximum, value))
 
 
+def _write_file(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def _drain(buffer: io.StringIO) -> str:
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
+
+
 @router.get("/profiles")
 async def get_profiles(request: Request, _: str = Depends(require_api_user)) -> dict[str, Any]:
     profile_store = request.app.state.profile_store
@@ -58,21 +65,25 @@ async def upload_session_state(
     if profile is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
 
-    body = await session_file.read()
-    if len(body) > 5 * 1024 * 1024:
+    if session_file.size is not None and session_file.size > MAX_SESSION_STATE_BYTES:
         raise HTTPException(status_code=400, detail="Session file too large")
 
+    body = bytearray()
+    while chunk := await session_file.read(SESSION_READ_CHUNK_BYTES):
+        body.extend(chunk)
+        if len(body) > MAX_SESSION_STATE_BYTES:
+            raise HTTPException(status_code=400, detail="Session file too large")
+
     try:
-        payload = json.loads(body.decode("utf-8", errors="ignore"))
-    except json.JSONDecodeError as exc:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as exc:
         raise HTTPException(status_code=400, detail=f"Invalid JSON: {exc.msg}") from exc
 
     if not isinstance(payload, dict):
         raise HTTPException(status_code=400, detail="Session state must be a JSON object")
 
     target_path = profile_store.resolve_storage_state_path(profile_name)
-    target_path.parent.mkdir(parents=True, exist_ok=True)
-    target_path.write_text(json.dumps(payload), encoding="utf-8")
+    await asyncio.to_thread(_write_file, target_path, orjson.dumps(payload))
 
     return {
         "message": "Session state uploaded",
@@ -156,12 +167,9 @@ async def get_job_detail(
     job_id: str,
     _: str = Depends(require_api_user),
 ) -> dict[str, Any]:
-    db = request.app.state.db
-    job = await repository.get_job(db, job_id)
+    job, counts = await repository.get_job_with_counts(request.app.state.db, job_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-
-    counts = await repository.get_job_counts(db, job_id)
     return {"job": job, "counts": counts}
 
 
@@ -197,34 +205,25 @@ async def export_job_results_csv(
     request: Request,
     job_id: str,
     _: str = Depends(require_api_user),
-) -> Response:
+) -> StreamingResponse:
     db = request.app.state.db
     job = await repository.get_job(db, job_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    rows = await repository.list_results_for_export(db, job_id)
-    stream = io.StringIO()
-    writer = csv.writer(stream)
-    writer.writerow(
-        ["code", "status", "source", "reason", "attempts", "http_status", "redirect_url", "checked_at"]
-    )
-    for row in rows:
+    async def iter_csv() -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
         writer.writerow(
-            [
-                row["code"],
-                row["status"],
-                row["source"],
-                row["reason"],
-                row["attempts"],
-                row["http_status"],
-                row["redirect_url"],
-                row["checked_at"],
-            ]
+            ["code", "status", "source", "reason", "attempts", "http_status", "redirect_url", "checked_at"]
         )
+        yield _drain(buffer)
+        async for rows in repository.iter_result_batches_for_export(db, job_id):
+            writer.writerows(rows)
+            yield _drain(buffer)
 
-    return Response(
-        content=stream.getvalue(),
+    return StreamingResponse(
+        iter_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=job_{job_id}.csv"},
     )
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import csv
 import io
+import itertools
 import re
 from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator
 
 from fastapi import UploadFile
 
 
-SPLIT_PATTERN = re.compile(r"[\s,;|]+")
+TOKEN_PATTERN = re.compile(r"""[^\s,;|"']+(?:["']+[^\s,;|"']+)*""")
+# A line without these is a single csv.reader cell: the line minus its terminator.
+CSV_STRUCTURE_PATTERN = re.compile(r'[,"\r\n\x00]')
 
 
 @dataclass
@@ -29,53 +34,77 @@ def _normalize_code(token: str) -> str:
 def parse_codes_from_text(text: str) -> list[str]:
     if not text:
         return []
-    raw_tokens = SPLIT_PATTERN.split(text)
-    cleaned: list[str] = []
-    for token in raw_tokens:
-        normalized = _normalize_code(token)
+    return TOKEN_PATTERN.findall(text)
+
+
+def _iter_csv_codes(lines: Iterable[str]) -> Iterator[str]:
+    lines = iter(lines)
+    for line in lines:
+        cell = line[:-1] if line.endswith("\n") else line
+        if cell.endswith("\r"):
+            cell = cell[:-1]
+        if CSV_STRUCTURE_PATTERN.search(cell):
+            # No earlier line had a quote, so this line starts a fresh record.
+            for row in csv.reader(itertools.chain((line,), lines)):
+                for field in row:
+                    normalized = _normalize_code(field)
+                    if normalized:
+                        yield normalized
+            return
+        normalized = _normalize_code(cell)
         if normalized:
-            cleaned.append(normalized)
-    return cleaned
+            yield normalized
 
 
 def parse_codes_from_csv_text(text: str) -> list[str]:
     if not text:
         return []
+    return list(_iter_csv_codes(io.StringIO(text)))
 
-    reader = csv.reader(io.StringIO(text))
-    tokens: list[str] = []
-    for row in reader:
-        for cell in row:
-            normalized = _normalize_code(cell)
-            if normalized:
-                tokens.append(normalized)
-    return tokens
 
+def _iter_decoded_lines(stream: BinaryIO) -> Iterator[str]:
+    # Splitting on b"\n" is safe for UTF-8: that byte never occurs inside a multi-byte sequence.
+    for line in stream:
+        yield line.decode("utf-8", errors="ignore")
 
-async def parse_codes_from_upload(upload: UploadFile) -> list[str]:
-    blob = await upload.read()
-    text = blob.decode("utf-8", errors="ignore")
-    filename = (upload.filename or "").lower()
 
-    if filename.endswith(".csv"):
-        return parse_codes_from_csv_text(text)
-    return parse_codes_from_text(text)
+def _collect_codes_from_stream(stream: BinaryIO, is_csv: bool) -> tuple[dict[str, None], int]:
+    stream.seek(0)
+    lines = _iter_decoded_lines(stream)
+    unique: dict[str, None] = {}
+    raw_count = 0
+    if is_csv:
+        for code in _iter_csv_codes(lines):
+            raw_count += 1
+            unique[code] = None
+        return unique, raw_count
 
+    for line in lines:
+        tokens = TOKEN_PATTERN.findall(line)
+        raw_count += len(tokens)
+        unique.update(dict.fromkeys(tokens))
+    return unique, raw_count
 
-async def collect_codes(pasted_codes: str, files: list[UploadFile]) -> CodeCollection:
-    merged: list[str] = []
-    if pasted_codes.strip():
-        merged.extend(parse_codes_from_text(pasted_codes))
 
-    for upload in files:
-        merged.extend(await parse_codes_from_upload(upload))
+async def collect_codes_from_upload(upload: UploadFile) -> tuple[dict[str, None], int]:
+    is_csv = (upload.filename or "").lower().endswith(".csv")
+    return await asyncio.to_thread(_collect_codes_from_stream, upload.file, is_csv)
 
-    seen: set[str] = set()
-    deduped: list[str] = []
-    for code in merged:
-        if code in seen:
-            continue
-        seen.add(code)
-        deduped.append(code)
 
-    return CodeCollection(codes=deduped, raw_count=len(merged), unique_count=len(deduped))
+async def collect_codes(pasted_codes: str, files: list[UploadFile]) -> CodeCollection:
+    unique: dict[str, None] = {}
+    raw_count = 0
+    if pasted_codes.strip():
+        tokens = parse_codes_from_text(pasted_codes)
+        raw_count += len(tokens)
+        unique.update(dict.fromkeys(tokens))
+
+    # Merging in upload order keeps the global first-seen order.
+    for upload_codes, upload_raw_count in await asyncio.gather(
+        *(collect_codes_from_upload(upload) for upload in files)
+    ):
+        raw_count += upload_raw_count
+        unique.update(upload_codes)
+
+    codes = list(unique)
+    return CodeCollection(codes=codes, raw_count=raw_count, unique_count=len(codes))
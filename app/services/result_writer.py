@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from app import repository
+from app.db import Database
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_WRITER_FLUSH_SECONDS = 0.05
+RESULT_WRITER_MAX_BATCH = 500
+
+
+class ResultWriter:
+    # Only the latest update per result id is kept: a final update overwrites every
+    # column an earlier queued_browser update touched.
+    def __init__(
+        self,
+        db: Database,
+        *,
+        flush_seconds: float = RESULT_WRITER_FLUSH_SECONDS,
+        max_batch: int = RESULT_WRITER_MAX_BATCH,
+    ) -> None:
+        self.db = db
+        self.flush_seconds = flush_seconds
+        self.max_batch = max(1, max_batch)
+        self._pending: dict[int, tuple[str, tuple[Any, ...]]] = {}
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._closing = False
+        self._error: Exception | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="result-writer")
+
+    async def close(self) -> None:
+        # Let the loop finish its current flush instead of cancelling it mid-transaction.
+        task, self._task = self._task, None
+        self._closing = True
+        self._has_pending.set()
+        self._batch_full.set()
+        if task is not None:
+            await task
+        await self.flush()
+
+    def mark_result_queued_browser(
+        self,
+        result_id: int,
+        *,
+        reason: str,
+        attempts: int,
+        http_status: int | None,
+        redirect_url: str | None,
+    ) -> None:
+        self._submit(
+            result_id,
+            "queued_browser",
+            repository.result_queued_browser_params(
+                result_id,
+                reason=reason,
+                attempts=attempts,
+                http_status=http_status,
+                redirect_url=redirect_url,
+            ),
+        )
+
+    def mark_result_final(
+        self,
+        result_id: int,
+        *,
+        status: str,
+        source: str,
+        reason: str,
+        attempts: int,
+        http_status: int | None,
+        redirect_url: str | None,
+    ) -> None:
+        self._submit(
+            result_id,
+            "final",
+            repository.result_final_params(
+                result_id,
+                status=status,
+                source=source,
+                reason=reason,
+                attempts=attempts,
+                http_status=http_status,
+                redirect_url=redirect_url,
+            ),
+        )
+
+    async def flush(self) -> None:
+        if self._error is not None:
+            raise self._error
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._has_pending.clear()
+        self._batch_full.clear()
+        try:
+            await repository.apply_result_updates(self.db, batch.values())
+        except Exception as exc:
+            logger.exception("Failed to write %d result updates", len(batch))
+            self._error = exc
+            raise
+
+    def _submit(self, result_id: int, kind: str, params: tuple[Any, ...]) -> None:
+        # A failed write stops the writer; workers fail on their next update so the job does too.
+        if self._error is not None:
+            raise self._error
+        self._pending[result_id] = (kind, params)
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            await self._has_pending.wait()
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
@@ -1,20 +1,51 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import codecs
 import random
+import re
+import threading
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 from urllib.parse import quote
 
 import httpx
+import orjson
 
 
 RETRYABLE_HTTP_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+MAX_CLASSIFY_BODY_BYTES = 200000
+BROWSER_FALLBACK_STATUSES = frozenset({"unknown", "blocked", "error"})
+# Encodings in which ASCII text is stored byte-for-byte and no multi-byte
+# sequence contains an ASCII byte, so ASCII literals can be searched undecoded.
+ASCII_COMPATIBLE_ENCODINGS = frozenset(
+    {"ascii", "utf-8", "iso8859-1", "iso8859-15", "cp1252", "iso8859-2", "cp1250", "cp1251", "koi8-r"}
+)
+
+_rng = random.Random()
+
+STORAGE_STATE_CACHE_SIZE = 16
+_STORAGE_STATE_COOKIES: dict[tuple[str, int], tuple[tuple[str, str, str | None, str], ...]] = {}
+# Filled from asyncio.to_thread workers.
+_storage_state_lock = threading.Lock()
+
+_EXC_REASON: dict[tuple[str, type[BaseException]], str] = {
+    ("HTTP exception", exc_type): f"HTTP exception: {exc_type.__name__}"
+    for exc_type in (
+        httpx.ConnectTimeout,
+        httpx.ReadTimeout,
+        httpx.WriteTimeout,
+        httpx.PoolTimeout,
+        httpx.ConnectError,
+        httpx.ReadError,
+        httpx.RemoteProtocolError,
+    )
+}
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationOutcome:
     status: str
     source: str
@@ -24,38 +55,48 @@ class ValidationOutcome:
     redirect_url: str | None = None
 
 
-def _normalize_text(value: str) -> str:
-    return value.lower().strip()
-
-
-def _contains_any(text: str, patterns: list[str]) -> bool:
-    if not patterns:
-        return False
-    normalized = _normalize_text(text)
-    for pattern in patterns:
-        token = _normalize_text(pattern)
-        if token and token in normalized:
-            return True
-    return False
+def _pattern_matches(pattern: re.Pattern[Any] | None, text: Any) -> bool:
+    return pattern is not None and pattern.search(text) is not None
 
 
-def _rule_matches(rule: dict[str, Any], status_code: int, body_text: str, final_url: str) -> bool:
-    status_codes = rule.get("status_codes") or []
-    if status_codes and status_code in status_codes:
+def _rule_matches(
+    rule: dict[str, Any],
+    status_code: int,
+    body_lower: str | bytes,
+    url_lower: str,
+    body_key: str = "body_pattern",
+) -> bool:
+    if status_code in rule.get("status_codes", ()):
         return True
-    if _contains_any(body_text, rule.get("body_contains_any") or []):
+    if _pattern_matches(rule.get(body_key), body_lower):
         return True
-    if _contains_any(final_url, rule.get("url_contains_any") or []):
+    if _pattern_matches(rule.get("url_pattern"), url_lower):
         return True
     return False
 
 
-def render_code_url(template: str, code: str) -> str:
-    escaped = quote(code, safe="")
+def exception_reason(prefix: str, exc: BaseException) -> str:
+    key = (prefix, type(exc))
+    reason = _EXC_REASON.get(key)
+    if reason is None:
+        reason = _EXC_REASON[key] = f"{prefix}: {type(exc).__name__}"
+    return reason
+
+
+def make_url_renderer(template: str) -> Callable[[str], str]:
     if "{code}" in template:
-        return template.replace("{code}", escaped)
+        parts = template.split("{code}")
+        return lambda code: quote(code, safe="").join(parts)
     separator = "&" if "?" in template else "?"
-    return f"{template}{separator}code={escaped}"
+    prefix = f"{template}{separator}code="
+    return lambda code: prefix + quote(code, safe="")
+
+
+_url_renderer = lru_cache(maxsize=64)(make_url_renderer)
+
+
+def render_code_url(template: str, code: str) -> str:
+    return _url_renderer(template)(code)
 
 
 def build_http_request(
@@ -102,20 +143,47 @@ def build_http_request(
     }
 
 
-def classify_http_response(response: httpx.Response, profile: dict[str, Any]) -> tuple[str, str]:
-    text = response.text[:200000]
-    final_url = str(response.url)
-    status_code = response.status_code
+@lru_cache(maxsize=32)
+def _is_ascii_compatible(encoding: str | None) -> bool:
+    try:
+        return codecs.lookup(encoding or "utf-8").name in ASCII_COMPATIBLE_ENCODINGS
+    except LookupError:
+        return False
+
+
+def _decode_body_prefix(raw: bytes, encoding: str | None) -> str:
+    try:
+        return raw.decode(encoding or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
+
+
+def classify_http_response(
+    response: httpx.Response,
+    profile: dict[str, Any],
+    final_url: str | None = None,
+) -> tuple[str, str]:
+    raw = response.content[:MAX_CLASSIFY_BODY_BYTES]
+    encoding = response.encoding
     http_cfg = profile["http"]
+    body: str | bytes
+    if http_cfg.get("ascii_body_patterns") and _is_ascii_compatible(encoding):
+        body = raw.lower()
+        body_key = "body_bytes_pattern"
+    else:
+        body = _decode_body_prefix(raw, encoding).lower()
+        body_key = "body_pattern"
+    url_lower = (final_url if final_url is not None else str(response.url)).lower()
+    status_code = response.status_code
 
     blocked_rule = http_cfg.get("blocked", {})
-    if _rule_matches(blocked_rule, status_code, text, final_url):
+    if _rule_matches(blocked_rule, status_code, body, url_lower, body_key):
         return "blocked", "Matched blocked rule"
 
     success_rule = http_cfg.get("success", {})
     failure_rule = http_cfg.get("failure", {})
-    success_match = _rule_matches(success_rule, status_code, text, final_url)
-    failure_match = _rule_matches(failure_rule, status_code, text, final_url)
+    success_match = _rule_matches(success_rule, status_code, body, url_lower, body_key)
+    failure_match = _rule_matches(failure_rule, status_code, body, url_lower, body_key)
 
     if success_match and not failure_match:
         return "valid", "Matched success rule"
@@ -128,24 +196,18 @@ def classify_http_response(response: httpx.Response, profile: dict[str, Any]) ->
 
 
 def classify_browser_content(content: str, current_url: str, profile: dict[str, Any]) -> tuple[str, str]:
+    content = content.lower()
+    current_url = current_url.lower()
     browser_cfg = profile["browser"]
     http_cfg = profile["http"]
+    http_success = http_cfg.get("success") or {}
+    http_failure = http_cfg.get("failure") or {}
 
-    blocked_patterns = list(browser_cfg.get("blocked_text_any") or []) + list(
-        (http_cfg.get("blocked") or {}).get("body_contains_any") or []
-    )
-    if _contains_any(content, blocked_patterns):
+    if _pattern_matches(browser_cfg.get("blocked_text_pattern"), content):
         return "blocked", "Blocked text detected in browser content"
 
-    success_patterns = list(browser_cfg.get("success_text_any") or []) + list(
-        (http_cfg.get("success") or {}).get("body_contains_any") or []
-    )
-    failure_patterns = list(browser_cfg.get("failure_text_any") or []) + list(
-        (http_cfg.get("failure") or {}).get("body_contains_any") or []
-    )
-
-    success_match = _contains_any(content, success_patterns)
-    failure_match = _contains_any(content, failure_patterns)
+    success_match = _pattern_matches(browser_cfg.get("success_text_pattern"), content)
+    failure_match = _pattern_matches(browser_cfg.get("failure_text_pattern"), content)
 
     if success_match and not failure_match:
         return "valid", "Browser content matched success text"
@@ -154,9 +216,9 @@ def classify_browser_content(content: str, current_url: str, profile: dict[str,
     if success_match and failure_match:
         return "unknown", "Browser found both success and failure text"
 
-    if _contains_any(current_url, (http_cfg.get("success") or {}).get("url_contains_any") or []):
+    if _pattern_matches(http_success.get("url_pattern"), current_url):
         return "valid", "Current URL matched success rule"
-    if _contains_any(current_url, (http_cfg.get("failure") or {}).get("url_contains_any") or []):
+    if _pattern_matches(http_failure.get("url_pattern"), current_url):
         return "invalid", "Current URL matched failure rule"
 
     return "unknown", "No configured browser rule matched"
@@ -201,8 +263,7 @@ async def run_http_validation(
 
     for attempt in range(1, total_attempts + 1):
         if request_delay_ms > 0:
-            jitter = random.uniform(0.8, 1.2)
-            await asyncio.sleep((request_delay_ms * jitter) / 1000.0)
+            await asyncio.sleep(request_delay_ms * (0.8 + 0.4 * _rng.random()) / 1000.0)
 
         try:
             response = await client.request(
@@ -211,25 +272,26 @@ async def run_http_validation(
                 params=request_data.get("params"),
                 data=request_data.get("data"),
             )
-            status, reason = classify_http_response(response, profile)
+            final_url = str(response.url)
+            status, reason = classify_http_response(response, profile, final_url)
             last_outcome = ValidationOutcome(
                 status=status,
                 source="http",
                 reason=reason,
                 attempts=attempt,
                 http_status=response.status_code,
-                redirect_url=str(response.url),
+                redirect_url=final_url,
             )
         except Exception as exc:
             last_outcome = ValidationOutcome(
                 status="error",
                 source="http",
-                reason=f"HTTP exception: {exc.__class__.__name__}",
+                reason=exception_reason("HTTP exception", exc),
                 attempts=attempt,
             )
 
         if attempt < total_attempts and _is_retryable_http_result(last_outcome):
-            await asyncio.sleep(min(8.0, 0.75 * attempt + random.random()))
+            await asyncio.sleep(min(8.0, 0.75 * attempt + _rng.random()))
             continue
 
         return last_outcome
@@ -237,19 +299,17 @@ async def run_http_validation(
     return last_outcome
 
 
-def needs_browser_fallback(outcome: ValidationOutcome, profile: dict[str, Any]) -> bool:
-    if not profile["browser"].get("enabled", True):
-        return False
-    return outcome.status in {"unknown", "blocked", "error"}
-
-
 async def run_browser_validation(
     browser_context: Any,
     profile: dict[str, Any],
     code: str,
     redeem_url_override: str | None,
+    *,
+    page: Any | None = None,
 ) -> ValidationOutcome:
-    page = await browser_context.new_page()
+    owns_page = page is None
+    if page is None:
+        page = await browser_context.new_page()
     timeout_ms = int(profile["browser"].get("timeout_ms", 45000))
     wait_after_submit_ms = int(profile["browser"].get("wait_after_submit_ms", 2000))
 
@@ -318,27 +378,25 @@ async def run_browser_validation(
         return ValidationOutcome(
             status="error",
             source="browser",
-            reason=f"Browser exception: {exc.__class__.__name__}",
+            reason=exception_reason("Browser exception", exc),
             attempts=1,
         )
     finally:
-        await page.close()
-
+        if owns_page:
+            await page.close()
 
-def load_http_cookies_from_storage_state(storage_state_path: Path) -> httpx.Cookies:
-    cookies = httpx.Cookies()
-    if not storage_state_path.exists():
-        return cookies
 
+def _parse_storage_state_cookies(raw: bytes) -> tuple[tuple[str, str, str | None, str], ...]:
     try:
-        payload = json.loads(storage_state_path.read_text(encoding="utf-8"))
+        payload = orjson.loads(raw)
     except Exception:
-        return cookies
+        return ()
 
     cookie_entries = payload.get("cookies") if isinstance(payload, dict) else None
     if not isinstance(cookie_entries, list):
-        return cookies
+        return ()
 
+    parsed: list[tuple[str, str, str | None, str]] = []
     for entry in cookie_entries:
         if not isinstance(entry, dict):
             continue
@@ -348,6 +406,32 @@ def load_http_cookies_from_storage_state(storage_state_path: Path) -> httpx.Cook
         path = str(entry.get("path", "/")).strip() or "/"
         if not name:
             continue
+        parsed.append((name, value, domain, path))
+    return tuple(parsed)
+
+
+def load_http_cookies_from_storage_state(storage_state_path: Path) -> httpx.Cookies:
+    cookies = httpx.Cookies()
+    try:
+        mtime_ns = storage_state_path.stat().st_mtime_ns
+    except OSError:
+        return cookies
+
+    key = (str(storage_state_path), mtime_ns)
+    with _storage_state_lock:
+        entries = _STORAGE_STATE_COOKIES.get(key)
+    if entries is None:
+        try:
+            raw = storage_state_path.read_bytes()
+        except OSError:
+            return cookies
+        entries = _parse_storage_state_cookies(raw)
+        with _storage_state_lock:
+            while len(_STORAGE_STATE_COOKIES) >= STORAGE_STATE_CACHE_SIZE:
+                _STORAGE_STATE_COOKIES.pop(next(iter(_STORAGE_STATE_COOKIES)))
+            _STORAGE_STATE_COOKIES[key] = entries
+
+    for name, value, domain, path in entries:
         if domain:
             cookies.set(name=name, value=value, domain=domain, path=path)
         else:
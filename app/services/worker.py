@@ -1,19 +1,234 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any
+import importlib.util
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncGenerator, AsyncIterator, Coroutine, NamedTuple
 
 import httpx
 
 from app import repository
 from app.services import validator
+from app.services.result_writer import ResultWriter
 from app.services.validator import ValidationOutcome
 
 
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 60.0
+BROWSER_QUEUE_ITEMS_PER_WORKER = 4
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+EAGER_TASKS_AVAILABLE = sys.version_info >= (3, 12)
+
+
+def _http_limits(http_concurrency: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=http_concurrency * 2,
+        max_keepalive_connections=http_concurrency,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+class _JobSettings(NamedTuple):
+    job_id: str
+    redeem_url_override: str | None
+    max_retries: int
+    request_delay_ms: int
+    http_concurrency: int
+    browser_concurrency: int
+    browser_enabled: bool
+
+
+def _job_settings(job: dict[str, Any], profile: dict[str, Any]) -> _JobSettings:
+    browser_concurrency = int(job["browser_concurrency"])
+    return _JobSettings(
+        job_id=str(job["id"]),
+        redeem_url_override=job.get("redeem_url_override"),
+        max_retries=int(job["max_retries"]),
+        request_delay_ms=int(job["request_delay_ms"]),
+        http_concurrency=max(1, int(job["http_concurrency"])),
+        browser_concurrency=max(1, browser_concurrency),
+        browser_enabled=bool(profile["browser"].get("enabled", True)) and browser_concurrency > 0,
+    )
+
+
+def _start_task(coro: Coroutine[Any, Any, None], name: str) -> asyncio.Task[None]:
+    if EAGER_TASKS_AVAILABLE:
+        return asyncio.Task(coro, name=name, eager_start=True)
+    return asyncio.create_task(coro, name=name)
+
+
+async def _run_worker_group(name: str, coros: list[Coroutine[Any, Any, None]]) -> None:
+    # TaskGroup semantics on 3.10: the first failure cancels the rest and is re-raised.
+    tasks = [_start_task(coro, f"{name}-{index}") for index, coro in enumerate(coros)]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@asynccontextmanager
+async def _browser_session(
+    profile: dict[str, Any],
+    storage_state_path: Path | None,
+) -> AsyncIterator[tuple[Any | None, str]]:
+    playwright_runtime = None
+    browser = None
+    context = None
+    startup_error = ""
+
+    try:
+        try:
+            from playwright.async_api import async_playwright
+
+            playwright_runtime = await async_playwright().start()
+            browser = await playwright_runtime.chromium.launch(
+                headless=bool(profile["browser"].get("headless", True))
+            )
+
+            context_kwargs: dict[str, Any] = {}
+            if storage_state_path is not None:
+                context_kwargs["storage_state"] = str(storage_state_path)
+
+            context = await browser.new_context(**context_kwargs)
+        except Exception as exc:
+            startup_error = f"Browser startup failed: {exc.__class__.__name__}"
+
+        yield context, startup_error
+    finally:
+        if context is not None:
+            await context.close()
+        if browser is not None:
+            await browser.close()
+        if playwright_runtime is not None:
+            await playwright_runtime.stop()
+
+
+class _FairScheduler:
+    # A freed slot goes to the waiting job with the least accumulated check time, so a
+    # large job cannot starve one started after it.
+    def __init__(self, slots: int) -> None:
+        self._free = max(1, slots)
+        self._vtime: dict[str, float] = {}
+        self._waiters: dict[str, deque[asyncio.Future[None]]] = {}
+
+    def register(self, job_id: str) -> None:
+        # New jobs start level with the least-served running job rather than at zero.
+        self._vtime[job_id] = min(self._vtime.values(), default=0.0)
+        self._waiters[job_id] = deque()
+
+    def unregister(self, job_id: str) -> None:
+        self._vtime.pop(job_id, None)
+        self._waiters.pop(job_id, None)
+
+    @asynccontextmanager
+    async def slot(self, job_id: str) -> AsyncIterator[None]:
+        await self._acquire(job_id)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            if job_id in self._vtime:
+                self._vtime[job_id] += time.monotonic() - started
+            self._release()
+
+    async def _acquire(self, job_id: str) -> None:
+        if self._free > 0 and not any(self._waiters.values()):
+            self._free -= 1
+            return
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters[job_id].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; pass it on.
+                self._release()
+            else:
+                waiters = self._waiters.get(job_id)
+                if waiters is not None and waiter in waiters:
+                    waiters.remove(waiter)
+            raise
+
+    def _release(self) -> None:
+        while True:
+            waiting = [job_id for job_id, waiters in self._waiters.items() if waiters]
+            if not waiting:
+                self._free += 1
+                return
+            job_id = min(waiting, key=self._vtime.__getitem__)
+            waiter = self._waiters[job_id].popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+
+class _BrowserHandoff:
+    def __init__(self, maxsize: int) -> None:
+        self._items: deque[dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Semaphore(max(1, maxsize))
+        self._closed = False
+
+    async def put(self, item: dict[str, Any]) -> None:
+        await self._space.acquire()
+        self._items.append(item)
+        self._ready.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> dict[str, Any] | None:
+        while not self._items:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        self._space.release()
+        return self._items.popleft()
+
+
+class _PendingFeed:
+    def __init__(self, pages: AsyncGenerator[list[Any], None]) -> None:
+        self._pages = pages
+        self._rows: deque[Any] = deque()
+        self._lock = asyncio.Lock()
+        self._exhausted = False
+
+    async def has_rows(self) -> bool:
+        if not self._rows:
+            async with self._lock:
+                if not self._rows and not self._exhausted:
+                    page = await anext(self._pages, None)
+                    if page is None:
+                        self._exhausted = True
+                    else:
+                        self._rows.extend(page)
+        return bool(self._rows)
+
+    async def next(self) -> Any | None:
+        if await self.has_rows():
+            return self._rows.popleft()
+        return None
+
+    async def aclose(self) -> None:
+        await self._pages.aclose()
+
+
 class JobManager:
     def __init__(self, app: Any) -> None:
         self.app = app
         self.tasks: dict[str, asyncio.Task[None]] = {}
+        self.http_slots = _FairScheduler(app.state.settings.max_total_http_concurrency)
         self._shutdown = False
 
     async def start_queued_jobs(self) -> None:
@@ -53,200 +268,172 @@ class JobManager:
             return
 
         try:
-            await repository.mark_job_running(db, job_id)
-            pending_results = await repository.get_pending_results(db, job_id)
-
-            if not pending_results:
-                await repository.mark_job_completed(db, job_id)
-                return
-
-            http_queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
-            browser_queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
-
-            for row in pending_results:
-                await http_queue.put(row)
-
-            http_workers = [
-                asyncio.create_task(
-                    self._http_worker(job, profile, http_queue, browser_queue),
-                    name=f"http-worker-{job_id}-{index}",
-                )
-                for index in range(max(1, int(job["http_concurrency"])))
-            ]
-
-            browser_enabled = bool(profile["browser"].get("enabled", True)) and int(
-                job["browser_concurrency"]
-            ) > 0
-            browser_workers: list[asyncio.Task[None]] = []
-            if browser_enabled:
-                browser_workers = [
-                    asyncio.create_task(
-                        self._browser_worker(job, profile, browser_queue),
-                        name=f"browser-worker-{job_id}-{index}",
-                    )
-                    for index in range(max(1, int(job["browser_concurrency"])))
-                ]
-
-            await http_queue.join()
-            for _ in http_workers:
-                await http_queue.put(None)
-            await asyncio.gather(*http_workers, return_exceptions=True)
-
-            if browser_workers:
-                await browser_queue.join()
-                for _ in browser_workers:
-                    await browser_queue.put(None)
-                await asyncio.gather(*browser_workers, return_exceptions=True)
+            pending = _PendingFeed(repository.iter_pending_results(db, job_id))
+            try:
+                if not await pending.has_rows():
+                    await repository.mark_job_completed_empty(db, job_id)
+                    return
+                await repository.mark_job_running(db, job_id)
+                await self._run_stages(job, profile, pending)
+            finally:
+                await pending.aclose()
 
             await repository.mark_job_completed(db, job_id)
         except Exception as exc:
             await repository.mark_job_failed(db, job_id, f"Job failed: {exc.__class__.__name__}")
 
-    async def _http_worker(
-        self,
-        job: dict[str, Any],
-        profile: dict[str, Any],
-        http_queue: asyncio.Queue[dict[str, Any] | None],
-        browser_queue: asyncio.Queue[dict[str, Any] | None],
-    ) -> None:
+    async def _run_stages(self, job: dict[str, Any], profile: dict[str, Any], pending: _PendingFeed) -> None:
         db = self.app.state.db
         profile_store = self.app.state.profile_store
+        settings = _job_settings(job, profile)
+
+        browser_queue = _BrowserHandoff(settings.browser_concurrency * BROWSER_QUEUE_ITEMS_PER_WORKER)
 
         storage_state_path = profile_store.resolve_storage_state_path(profile["name"])
-        cookies = validator.load_http_cookies_from_storage_state(storage_state_path)
+        has_storage_state = await asyncio.to_thread(storage_state_path.exists)
+
+        worker_storage_state = storage_state_path if has_storage_state else None
+
+        writer = ResultWriter(db)
+        writer.start()
+        self.http_slots.register(settings.job_id)
+        try:
+            async with await self._build_http_client(
+                profile, settings.http_concurrency, worker_storage_state
+            ) as client:
+
+                async def http_stage() -> None:
+                    await _run_worker_group(
+                        f"http-worker-{settings.job_id}",
+                        [
+                            self._http_worker(settings, profile, client, writer, pending, browser_queue)
+                            for _ in range(settings.http_concurrency)
+                        ],
+                    )
+                    browser_queue.close()
+
+                if not settings.browser_enabled:
+                    await http_stage()
+                    return
+
+                async with _browser_session(profile, worker_storage_state) as (context, startup_error):
+                    browser_workers = [
+                        self._browser_worker(settings, profile, writer, browser_queue, context, startup_error)
+                        for _ in range(settings.browser_concurrency)
+                    ]
+                    await _run_worker_group(f"job-stage-{settings.job_id}", [http_stage(), *browser_workers])
+        finally:
+            self.http_slots.unregister(settings.job_id)
+            await writer.close()
+
+    async def _build_http_client(
+        self,
+        profile: dict[str, Any],
+        http_concurrency: int,
+        storage_state_path: Path | None,
+    ) -> httpx.AsyncClient:
+        cookies = httpx.Cookies()
+        if storage_state_path is not None:
+            cookies = await asyncio.to_thread(validator.load_http_cookies_from_storage_state, storage_state_path)
         timeout = httpx.Timeout(float(profile["http"].get("timeout_seconds", 20)))
 
         headers = dict(profile["http"].get("headers") or {})
-        if not any(key.lower() == "user-agent" for key in headers):
+        if "user-agent" not in {key.lower() for key in headers}:
             headers["User-Agent"] = "Mozilla/5.0 RedeemChecker/1.0"
 
-        async with httpx.AsyncClient(
+        return httpx.AsyncClient(
             timeout=timeout,
             follow_redirects=True,
             headers=headers,
             cookies=cookies,
-        ) as client:
-            while True:
-                item = await http_queue.get()
-                if item is None:
-                    http_queue.task_done()
-                    break
+            http2=HTTP2_AVAILABLE,
+            limits=_http_limits(http_concurrency),
+        )
 
-                result_id = int(item["id"])
-                code = str(item["code"])
+    async def _http_worker(
+        self,
+        settings: _JobSettings,
+        profile: dict[str, Any],
+        client: httpx.AsyncClient,
+        writer: ResultWriter,
+        pending: _PendingFeed,
+        browser_queue: _BrowserHandoff,
+    ) -> None:
+        while (item := await pending.next()) is not None:
+            result_id = item["id"]
+            code = item["code"]
 
-                try:
-                    await repository.mark_result_running(db, result_id)
+            try:
+                async with self.http_slots.slot(settings.job_id):
                     outcome = await validator.run_http_validation(
                         client,
                         profile,
                         code,
-                        job.get("redeem_url_override"),
-                        int(job["max_retries"]),
-                        int(job["request_delay_ms"]),
+                        settings.redeem_url_override,
+                        settings.max_retries,
+                        settings.request_delay_ms,
                     )
 
-                    if validator.needs_browser_fallback(outcome, profile) and int(
-                        job["browser_concurrency"]
-                    ) > 0:
-                        await repository.mark_result_queued_browser(
-                            db,
-                            result_id,
-                            reason=outcome.reason,
-                            attempts=outcome.attempts,
-                            http_status=outcome.http_status,
-                            redirect_url=outcome.redirect_url,
-                        )
-                        await browser_queue.put(
-                            {
-                                "result_id": result_id,
-                                "code": code,
-                                "http_outcome": {
-                                    "status": outcome.status,
-                                    "source": outcome.source,
-                                    "reason": outcome.reason,
-                                    "attempts": outcome.attempts,
-                                    "http_status": outcome.http_status,
-                                    "redirect_url": outcome.redirect_url,
-                                },
-                            }
-                        )
-                    else:
-                        await repository.mark_result_final(
-                            db,
-                            result_id,
-                            status=outcome.status,
-                            source=outcome.source,
-                            reason=outcome.reason,
-                            attempts=outcome.attempts,
-                            http_status=outcome.http_status,
-                            redirect_url=outcome.redirect_url,
-                        )
-                except Exception as exc:
-                    await repository.mark_result_final(
-                        db,
+                if settings.browser_enabled and outcome.status in validator.BROWSER_FALLBACK_STATUSES:
+                    writer.mark_result_queued_browser(
                         result_id,
-                        status="error",
-                        source="http",
-                        reason=f"HTTP worker exception: {exc.__class__.__name__}",
-                        attempts=1,
-                        http_status=None,
-                        redirect_url=None,
+                        reason=outcome.reason,
+                        attempts=outcome.attempts,
+                        http_status=outcome.http_status,
+                        redirect_url=outcome.redirect_url,
+                    )
+                    await browser_queue.put(
+                        {"result_id": result_id, "code": code, "http_outcome": outcome}
                     )
-                finally:
-                    http_queue.task_done()
+                else:
+                    writer.mark_result_final(
+                        result_id,
+                        status=outcome.status,
+                        source=outcome.source,
+                        reason=outcome.reason,
+                        attempts=outcome.attempts,
+                        http_status=outcome.http_status,
+                        redirect_url=outcome.redirect_url,
+                    )
+            except Exception as exc:
+                writer.mark_result_final(
+                    result_id,
+                    status="error",
+                    source="http",
+                    reason=validator.exception_reason("HTTP worker exception", exc),
+                    attempts=1,
+                    http_status=None,
+                    redirect_url=None,
+                )
 
     async def _browser_worker(
         self,
-        job: dict[str, Any],
+        settings: _JobSettings,
         profile: dict[str, Any],
-        browser_queue: asyncio.Queue[dict[str, Any] | None],
+        writer: ResultWriter,
+        browser_queue: _BrowserHandoff,
+        context: Any | None,
+        startup_error: str,
     ) -> None:
-        db = self.app.state.db
-        profile_store = self.app.state.profile_store
-
-        browser_ready = False
-        startup_error = ""
-        playwright_runtime = None
-        browser = None
-        context = None
-
-        try:
-            from playwright.async_api import async_playwright
-
-            playwright_runtime = await async_playwright().start()
-            browser = await playwright_runtime.chromium.launch(
-                headless=bool(profile["browser"].get("headless", True))
-            )
-
-            context_kwargs: dict[str, Any] = {}
-            storage_state_path = profile_store.resolve_storage_state_path(profile["name"])
-            if storage_state_path.exists():
-                context_kwargs["storage_state"] = str(storage_state_path)
-
-            context = await browser.new_context(**context_kwargs)
-            browser_ready = True
-        except Exception as exc:
-            startup_error = f"Browser startup failed: {exc.__class__.__name__}"
+        reuse_page = bool(profile["browser"].get("reuse_page", False))
+        page = None
 
         try:
-            while True:
-                item = await browser_queue.get()
-                if item is None:
-                    browser_queue.task_done()
-                    break
-
-                result_id = int(item["result_id"])
-                code = str(item["code"])
-                prior = ValidationOutcome(**item["http_outcome"])
+            while (item := await browser_queue.get()) is not None:
+                result_id = item["result_id"]
+                code = item["code"]
+                prior: ValidationOutcome = item["http_outcome"]
 
                 try:
-                    if browser_ready and context is not None:
+                    if context is not None:
+                        if reuse_page and (page is None or page.is_closed()):
+                            page = await context.new_page()
                         browser_outcome = await validator.run_browser_validation(
                             context,
                             profile,
                             code,
-                            job.get("redeem_url_override"),
+                            settings.redeem_url_override,
+                            page=page,
                         )
                         final_outcome = ValidationOutcome(
                             status=browser_outcome.status,
@@ -266,8 +453,7 @@ class JobManager:
                             redirect_url=prior.redirect_url,
                         )
 
-                    await repository.mark_result_final(
-                        db,
+                    writer.mark_result_final(
                         result_id,
                         status=final_outcome.status,
                         source=final_outcome.source,
@@ -277,22 +463,15 @@ class JobManager:
                         redirect_url=final_outcome.redirect_url,
                     )
                 except Exception as exc:
-                    await repository.mark_result_final(
-                        db,
+                    writer.mark_result_final(
                         result_id,
                         status="error",
                         source="browser",
-                        reason=f"Browser worker exception: {exc.__class__.__name__}",
+                        reason=validator.exception_reason("Browser worker exception", exc),
                         attempts=max(1, prior.attempts),
                         http_status=prior.http_status,
                         redirect_url=prior.redirect_url,
                     )
-                finally:
-                    browser_queue.task_done()
         finally:
-            if context is not None:
-                await context.close()
-            if browser is not None:
-                await browser.close()
-            if playwright_runtime is not None:
-                await playwright_runtime.stop()
+            if page is not None and not page.is_closed():
+                await page.close()